@@ -1,7 +1,15 @@
+import os
 from flask import Flask
+from jinja2 import FileSystemBytecodeCache
 from app.extensions import db
+from app.assets import init_assets
+from app.cli import register_commands
+from app.limiter import AdmissionController
 from app.controllers.sqlite_data_manager import SQLiteDataManager
+from app.models.models import ensure_schema
+from app.services.title_index import TitleIndex, MissCache
 from app.views.routes import main_bp, register_error_handlers
+from app.views.assets import assets_bp
 from config.config import config
 
 def create_app(config_name='default'):
@@ -10,22 +18,66 @@ def create_app(config_name='default'):
 	
 	# Configure the app
 	app.config.from_object(config[config_name])
+	os.makedirs(app.config['INSTANCE_PATH'], exist_ok=True)
+	if not app.config['SECRET_KEY']:
+		app.config['SECRET_KEY'] = os.urandom(24)
+	
+	# Cache compiled templates on disk so new workers skip compilation
+	if app.config['JINJA_BYTECODE_CACHE_DIR']:
+		os.makedirs(app.config['JINJA_BYTECODE_CACHE_DIR'], exist_ok=True)
+		app.jinja_options = {
+			**app.jinja_options,
+			'bytecode_cache': FileSystemBytecodeCache(app.config['JINJA_BYTECODE_CACHE_DIR'])
+		}
 	
 	# Initialize SQLAlchemy with the app
 	db.init_app(app)
 	
-	# Create database tables
+	# Create database tables if the schema is out of date
 	with app.app_context():
-		db.create_all()
+		ensure_schema()
 	
 	# Initialize the data manager
 	data_manager = SQLiteDataManager()
 	app.config['data_manager'] = data_manager
 	
+	# Build the title autocomplete index from the titles already stored
+	title_index = TitleIndex(max_entries=app.config['TITLE_INDEX_MAX_ENTRIES'])
+	with app.app_context():
+		title_index.rebuild(data_manager.get_movie_titles(limit=title_index.max_entries))
+	app.config['title_index'] = title_index
+	app.config['suggest_misses'] = MissCache(
+		max_entries=app.config['SUGGEST_MISS_CACHE_SIZE'],
+		ttl=app.config['SUGGEST_MISS_CACHE_TTL']
+	)
+	
+	# Set up admission control of the expensive routes
+	app.config['limiter'] = AdmissionController(
+		path=app.config['LIMITER_DB_PATH'],
+		limits=app.config['LIMITER_ROUTES'],
+		slot_ttl=app.config['LIMITER_SLOT_TTL']
+	)
+	
+	# Load the vendored asset manifest
+	init_assets(app)
+	
 	# Register blueprints
 	app.register_blueprint(main_bp)
+	app.register_blueprint(assets_bp)
 	
 	# Register error handlers
 	register_error_handlers(app)
 	
+	# Register CLI commands
+	register_commands(app)
+	
+	if app.config['PRELOAD_APP']:
+		# The app is created once before the server forks its workers:
+		# compile every template now so the workers inherit them, and close the
+		# database connections opened above so no worker shares a connection
+		for template_name in app.jinja_env.list_templates():
+			app.jinja_env.get_template(template_name)
+		with app.app_context():
+			db.engine.dispose()
+	
 	return app
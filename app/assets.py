@@ -0,0 +1,41 @@
+import json
+from flask import url_for
+
+# Third-party assets used by the templates, keyed by logical name.
+# The CDN URL is used whenever the asset has not been vendored by build_assets.py.
+VENDOR_ASSETS = {
+	'bootstrap.css': 'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css',
+	'bootstrap.js': 'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js',
+	'fontawesome.css': 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css',
+}
+
+
+def load_manifest(path: str) -> dict:
+	"""
+	Load the asset manifest written by build_assets.py.
+	Args:
+		path (str): Path to the manifest file
+	Returns:
+		dict: Mapping of logical asset names to fingerprinted filenames,
+		empty if the assets have not been built
+	"""
+	try:
+		with open(path) as f:
+			return json.load(f)
+	except (OSError, ValueError):
+		return {}
+
+
+def init_assets(app):
+	"""Load the asset manifest and register the asset_url template helper"""
+	manifest = load_manifest(app.config['ASSET_MANIFEST_PATH'])
+	app.config['asset_manifest'] = manifest
+
+	def asset_url(name):
+		"""Return the URL of a vendored asset, falling back to its CDN URL"""
+		filename = manifest.get(name)
+		if filename:
+			return url_for('assets.asset', filename=filename)
+		return VENDOR_ASSETS[name]
+
+	app.jinja_env.globals['asset_url'] = asset_url
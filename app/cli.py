@@ -0,0 +1,50 @@
+import click
+from flask import current_app
+
+
+def register_commands(app):
+	"""Register the application's flask CLI commands"""
+
+	@app.cli.command('build-recommendations')
+	@click.option('--full', is_flag=True, help='Recompute every title instead of only the changed ones.')
+	def build_recommendations_command(full):
+		"""Rebuild the "similar movies" lookup table."""
+		# NumPy/SciPy are only needed by this offline job, not by the web workers
+		from app.services.recommendations import build_recommendations
+
+		stats = build_recommendations(
+			full=full,
+			top_k=current_app.config['RECOMMENDATIONS_TOP_K'],
+			min_cooccurrence=current_app.config['RECOMMENDATIONS_MIN_COOCCURRENCE'],
+			chunk_size=current_app.config['RECOMMENDATIONS_CHUNK_SIZE']
+		)
+		click.echo(
+			f"Recomputed {stats['recomputed']} of {stats['titles']} titles, "
+			f"wrote {stats['similarities']} similarities."
+		)
+
+	@app.cli.command('export-columns')
+	@click.argument('output_dir', type=click.Path(file_okay=False))
+	@click.option('--table', 'tables', multiple=True, type=click.Choice(['users', 'movies']),
+				  help='Table to export, may be repeated. Defaults to all tables.')
+	@click.option('--partition', type=click.Choice(['day', 'month']), default='day', show_default=True,
+				  help='Partition the rows by the day or month they were created.')
+	@click.option('--chunk-size', type=click.IntRange(min=1), default=10000, show_default=True,
+				  help='Rows fetched from the database at once.')
+	@click.option('--full', is_flag=True, help='Replace the previous export instead of adding the new rows.')
+	def export_columns_command(output_dir, tables, partition, chunk_size, full):
+		"""Export the tables as NumPy column files for analytics."""
+		from app.services.columnar_export import TABLES, export_tables
+
+		stats = export_tables(
+			output_dir,
+			tables=tables or tuple(TABLES),
+			full=full,
+			partition=partition,
+			chunk_size=chunk_size
+		)
+		for table, table_stats in stats.items():
+			click.echo(
+				f"{table}: exported {table_stats['rows']} rows into {table_stats['partitions']} partitions "
+				f"(up to id {table_stats['last_id']})."
+			)
@@ -1,7 +1,7 @@
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional
 from flask import current_app
 from app.controllers.data_manager_interface import DataManagerInterface
-from app.models.models import User, Movie
+from app.models.models import User, Movie, MovieSimilarity, RecommendationChange, normalize_title
 from app.extensions import db
 
 class SQLiteDataManager(DataManagerInterface):
@@ -23,6 +23,68 @@ class SQLiteDataManager(DataManagerInterface):
 		"""Retrieve all movies for a specific user."""
 		return Movie.query.filter_by(user_id=user_id).all()
 	
+	def iter_user_movies(self, user_id: int, batch_size: int = 500) -> Iterator[Movie]:
+		"""
+		Iterate over a user's movies, fetching them from the database in batches.
+		Each batch is a separate query for the movies after the last id seen, read
+		in full, so no cursor (and no SQLite read lock) is held between batches
+		while the caller is busy, e.g. streaming a page to a slow client.
+		"""
+		last_id = 0
+		while True:
+			movies = (Movie.query
+					  .filter(Movie.user_id == user_id, Movie.id > last_id)
+					  .order_by(Movie.id)
+					  .limit(batch_size)
+					  .all())
+			yield from movies
+			if len(movies) < batch_size:
+				return
+			last_id = movies[-1].id
+	
+	def has_movies(self, user_id: int) -> bool:
+		"""Check whether a user has any movies."""
+		return self.db.session.query(Movie.query.filter_by(user_id=user_id).exists()).scalar()
+	
+	def get_movie_titles(self, limit: Optional[int] = None) -> List[str]:
+		"""Retrieve the distinct movie titles stored in the database."""
+		query = self.db.session.query(Movie.title).distinct()
+		if limit is not None:
+			query = query.limit(limit)
+		return [title for (title,) in query]
+	
+	def get_similar_movies(self, title: str, limit: int = 10, exclude_user_id: Optional[int] = None) -> List[MovieSimilarity]:
+		"""
+		Retrieve the precomputed recommendations for a movie title.
+		Args:
+			title (str): Movie title
+			limit (int): Maximum number of recommendations
+			exclude_user_id (int): Leave out the titles this user already has
+		Returns:
+			list: The recommendations, most similar first
+		"""
+		query = MovieSimilarity.query.filter_by(title_key=normalize_title(title))
+		if exclude_user_id is not None:
+			owned = (self.db.select(self.db.func.normalize_title(Movie.title))
+					 .where(Movie.user_id == exclude_user_id))
+			query = query.filter(self.db.func.normalize_title(MovieSimilarity.similar_title).not_in(owned))
+		return query.order_by(MovieSimilarity.rank).limit(limit).all()
+	
+	def _record_changes(self, titles: List[str], user_id: Optional[int] = None) -> None:
+		"""
+		Mark titles for the next incremental recommendations build.
+		When a title leaves a user's collection, pass user_id: the user's other
+		titles may have been recommended only because of it, and the build can
+		no longer find them through the removed title.
+		"""
+		titles = list(titles)
+		if user_id is not None:
+			titles.extend(title for (title,) in self.db.session.query(Movie.title).filter_by(user_id=user_id))
+		self.db.session.add_all(
+			RecommendationChange(title_key=key)
+			for key in {normalize_title(title) for title in titles}
+		)
+	
 	def get_movie(self, movie_id: int) -> Optional[Movie]:
 		"""Retrieve a movie from the database."""
 		return Movie.query.get(movie_id)
@@ -57,6 +119,7 @@ class SQLiteDataManager(DataManagerInterface):
 				poster_url=poster_url
 			)
 			self.db.session.add(movie)
+			self._record_changes([title])
 			self.db.session.commit()
 			return movie
 		except Exception:
@@ -70,6 +133,9 @@ class SQLiteDataManager(DataManagerInterface):
 			if not movie:
 				return None
 			
+			if movie.title != title:
+				self._record_changes([movie.title, title], user_id=movie.user_id)
+			
 			movie.title = title
 			movie.director = director
 			movie.year = year
@@ -90,6 +156,7 @@ class SQLiteDataManager(DataManagerInterface):
 			if not movie:
 				return False
 			
+			self._record_changes([movie.title], user_id=movie.user_id)
 			self.db.session.delete(movie)
 			self.db.session.commit()
 			return True
@@ -105,6 +172,8 @@ class SQLiteDataManager(DataManagerInterface):
 				return False
 			
 			# Delete all movies associated with the user
+			titles = [title for (title,) in self.db.session.query(Movie.title).filter_by(user_id=user_id)]
+			self._record_changes(titles)
 			Movie.query.filter_by(user_id=user_id).delete()
 			
 			# Delete the user
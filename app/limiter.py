@@ -0,0 +1,191 @@
+import math
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+	key TEXT PRIMARY KEY,
+	tokens REAL NOT NULL,
+	updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS slots (
+	id INTEGER PRIMARY KEY,
+	route TEXT NOT NULL,
+	acquired_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_slots_route ON slots (route, acquired_at);
+CREATE TABLE IF NOT EXISTS counters (
+	route TEXT NOT NULL,
+	outcome TEXT NOT NULL,
+	value INTEGER NOT NULL,
+	PRIMARY KEY (route, outcome)
+);
+"""
+
+# Outcomes counted per route
+ADMITTED = 'admitted'
+RATE_LIMITED = 'rate_limited'
+OVERLOADED = 'overloaded'
+
+# Seconds between two checks for a free slot while queued
+POLL_INTERVAL = 0.02
+
+
+class AdmissionController:
+	"""Per-route concurrency limits and per-client token buckets.
+
+	State lives in a small SQLite database so that every worker process on the
+	host sees the same buckets and in-flight counts. Each route is configured
+	with a dict of:
+		methods: HTTP methods of the route that are limited, e.g. ('POST',)
+		concurrency: Maximum number of requests handled at once
+		rate: Tokens added to each client's bucket per second
+		burst: Bucket capacity, i.e. requests a client may send at once
+		queue_timeout: Seconds a request may wait for a free slot
+		retry_after: Seconds suggested to clients rejected for lack of a slot
+
+	Slots of requests that never released them (e.g. a killed worker) expire
+	after slot_ttl seconds.
+	"""
+
+	def __init__(self, path: Optional[str] = None, limits: Optional[Dict[str, Dict]] = None, slot_ttl: float = 60.0):
+		"""
+		Initialize the controller.
+		Args:
+			path (str): SQLite database file, or None for a private in-memory
+				database only shared within this process
+			limits (dict): Limits per route name
+			slot_ttl (float): Seconds after which an unreleased slot expires
+		"""
+		self.limits = dict(limits or {})
+		self.slot_ttl = slot_ttl
+		self._local = threading.local()
+
+		if path is None:
+			self.database = f'file:admission-{uuid.uuid4().hex}?mode=memory&cache=shared'
+			# The in-memory database lives as long as one connection to it is open
+			self._keeper = self._connect()
+		else:
+			self.database = f'file:{path}'
+			self._keeper = None
+
+		self._connection().executescript(SCHEMA)
+
+	def _connect(self) -> sqlite3.Connection:
+		connection = sqlite3.connect(self.database, uri=True, timeout=5, isolation_level=None)
+		connection.execute('PRAGMA journal_mode=WAL')
+		connection.execute('PRAGMA synchronous=OFF')  # Limiter state is disposable
+		return connection
+
+	def _connection(self) -> sqlite3.Connection:
+		"""Return this thread's connection, opening a new one after a fork."""
+		if getattr(self._local, 'pid', None) != os.getpid():
+			self._local.connection = self._connect()
+			self._local.pid = os.getpid()
+		return self._local.connection
+
+	def _count(self, connection: sqlite3.Connection, route: str, outcome: str) -> None:
+		connection.execute(
+			'INSERT INTO counters (route, outcome, value) VALUES (?, ?, 1) '
+			'ON CONFLICT (route, outcome) DO UPDATE SET value = value + 1',
+			(route, outcome)
+		)
+
+	def acquire(self, route: str, client: str) -> Tuple[Optional[int], Optional[str], int]:
+		"""
+		Admit a request, waiting up to the route's queue_timeout for a free slot.
+		Args:
+			route (str): Name of the limited route
+			client (str): Identifier of the client, e.g. its address
+		Returns:
+			tuple: (slot_id, None, 0) when admitted; otherwise (None, outcome, retry_after)
+			where outcome is RATE_LIMITED or OVERLOADED and retry_after is in seconds
+		"""
+		limit = self.limits[route]
+		key = f'{route}:{client}'
+		deadline = time.monotonic() + limit['queue_timeout']
+		connection = self._connection()
+
+		while True:
+			now = time.time()
+			connection.execute('BEGIN IMMEDIATE')
+			try:
+				row = connection.execute('SELECT tokens, updated_at FROM buckets WHERE key = ?', (key,)).fetchone()
+				tokens = limit['burst'] if row is None else min(limit['burst'], row[0] + (now - row[1]) * limit['rate'])
+
+				if tokens < 1:
+					self._count(connection, route, RATE_LIMITED)
+					connection.execute('COMMIT')
+					return None, RATE_LIMITED, math.ceil((1 - tokens) / limit['rate'])
+
+				connection.execute('DELETE FROM slots WHERE route = ? AND acquired_at < ?', (route, now - self.slot_ttl))
+				(in_flight,) = connection.execute('SELECT COUNT(*) FROM slots WHERE route = ?', (route,)).fetchone()
+
+				if in_flight < limit['concurrency']:
+					connection.execute(
+						'INSERT OR REPLACE INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?)',
+						(key, tokens - 1, now)
+					)
+					slot_id = connection.execute(
+						'INSERT INTO slots (route, acquired_at) VALUES (?, ?)', (route, now)
+					).lastrowid
+					self._count(connection, route, ADMITTED)
+					if random.random() < 0.01:
+						self._prune_buckets(connection, now)
+					connection.execute('COMMIT')
+					return slot_id, None, 0
+
+				if time.monotonic() >= deadline:
+					self._count(connection, route, OVERLOADED)
+					connection.execute('COMMIT')
+					return None, OVERLOADED, limit['retry_after']
+
+				connection.execute('COMMIT')
+			except Exception:
+				connection.execute('ROLLBACK')
+				raise
+
+			time.sleep(POLL_INTERVAL)
+
+	def _prune_buckets(self, connection: sqlite3.Connection, now: float) -> None:
+		"""Drop buckets idle long enough to have refilled completely."""
+		longest_refill = max(limit['burst'] / limit['rate'] for limit in self.limits.values())
+		connection.execute('DELETE FROM buckets WHERE updated_at < ?', (now - longest_refill,))
+
+	def release(self, slot_id: int) -> None:
+		"""Free the slot taken by an admitted request."""
+		self._connection().execute('DELETE FROM slots WHERE id = ?', (slot_id,))
+
+	def snapshot(self) -> Dict[str, Dict]:
+		"""
+		Report the current saturation of every limited route.
+		Returns:
+			dict: Per route, the in-flight count, the concurrency limit, the
+			saturation ratio and the number of requests per outcome
+		"""
+		connection = self._connection()
+		cutoff = time.time() - self.slot_ttl
+		in_flight = dict(connection.execute(
+			'SELECT route, COUNT(*) FROM slots WHERE acquired_at >= ? GROUP BY route', (cutoff,)
+		).fetchall())
+		counters = {}
+		for route, outcome, value in connection.execute('SELECT route, outcome, value FROM counters'):
+			counters.setdefault(route, {})[outcome] = value
+
+		return {
+			route: {
+				'in_flight': in_flight.get(route, 0),
+				'concurrency': limit['concurrency'],
+				'saturation': in_flight.get(route, 0) / limit['concurrency'],
+				'requests': {
+					outcome: counters.get(route, {}).get(outcome, 0)
+					for outcome in (ADMITTED, RATE_LIMITED, OVERLOADED)
+				}
+			}
+			for route, limit in self.limits.items()
+		}
@@ -1,6 +1,56 @@
+import sqlite3
 from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from app.extensions import db
 
+# Bump whenever the models change, so existing databases get their tables and indexes created again
+SCHEMA_VERSION = 3
+
+
+def ensure_schema():
+	"""
+	Create the database tables unless the database is already at SCHEMA_VERSION.
+	Indexes added to existing tables are created as well. The version is stored in SQLite's user_version pragma, so an up-to-date
+	database costs a single pragma read instead of a full create_all.
+	Returns:
+		bool: True if the tables were (re)created, False if they were up to date
+	"""
+	if db.engine.dialect.name != 'sqlite':
+		db.create_all()
+		return True
+
+	with db.engine.connect() as connection:
+		if connection.exec_driver_sql('PRAGMA user_version').scalar() == SCHEMA_VERSION:
+			return False
+
+	db.create_all()
+	for table in db.metadata.sorted_tables:
+		for index in table.indexes:
+			index.create(db.engine, checkfirst=True)
+	with db.engine.connect() as connection:
+		connection.exec_driver_sql(f'PRAGMA user_version = {SCHEMA_VERSION}')
+	return True
+
+
+def normalize_title(title):
+	"""
+	Return the key under which titles are compared, so that differences in
+	case and whitespace between users' entries do not matter.
+	Args:
+		title (str): Movie title
+	Returns:
+		str: Normalized title
+	"""
+	return ' '.join(title.split()).casefold()
+
+
+@event.listens_for(Engine, 'connect')
+def register_sql_functions(dbapi_connection, connection_record):
+	"""Make normalize_title available to SQL queries on SQLite connections"""
+	if isinstance(dbapi_connection, sqlite3.Connection):
+		dbapi_connection.create_function('normalize_title', 1, normalize_title, deterministic=True)
+
 
 class User(db.Model):
 	"""
@@ -32,6 +82,7 @@ class Movie(db.Model):
 	Movie model representing a movie in a user's collection.
 	"""
 	__tablename__ = 'movies'
+	__table_args__ = (db.Index('ix_movies_user_id', 'user_id'),)
 
 	id = db.Column(db.Integer, primary_key=True)
 	title = db.Column(db.String(200), nullable=False)
@@ -57,4 +108,41 @@ class Movie(db.Model):
 			'poster_url': self.poster_url,
 			'user_id': self.user_id,
 			'created_at': self.created_at.isoformat()
-		} 
\ No newline at end of file
+		} 
+
+
+class MovieSimilarity(db.Model):
+	"""
+	Precomputed "users who have this also have" recommendation.
+	Rows are written by the build-recommendations command and read by title_key.
+	"""
+	__tablename__ = 'movie_similarities'
+	__table_args__ = (db.Index('ix_movie_similarities_title_key_rank', 'title_key', 'rank'),)
+
+	id = db.Column(db.Integer, primary_key=True)
+	title_key = db.Column(db.String(200), nullable=False)
+	similar_title = db.Column(db.String(200), nullable=False)
+	score = db.Column(db.Float, nullable=False)
+	rank = db.Column(db.Integer, nullable=False)
+
+	def to_dict(self):
+		"""
+		Convert similarity object to dictionary.
+		Returns:
+			dict: Similarity data
+		"""
+		return {
+			'title': self.similar_title,
+			'score': self.score
+		}
+
+
+class RecommendationChange(db.Model):
+	"""
+	Title whose collections changed since the last recommendations build.
+	Used by incremental builds to recompute only the affected titles.
+	"""
+	__tablename__ = 'recommendation_changes'
+
+	id = db.Column(db.Integer, primary_key=True)
+	title_key = db.Column(db.String(200), nullable=False)
@@ -0,0 +1,276 @@
+"""Columnar export of the users and movies tables.
+
+Rows are streamed from the database cursor in chunks and appended to one
+NumPy .npy file per column, so memory use depends on the chunk size only.
+Strings use the Arrow layout: <column>.offsets.npy (int64, one entry more
+than there are rows) and <column>.data.npy (the UTF-8 bytes), so that value
+i is data[offsets[i]:offsets[i + 1]].
+
+Each table is partitioned by the day (or month) of created_at, and each run
+writes a new part per partition covering the ids exported by that run:
+
+	<output>/movies/created=2024-05-01/part-00000000000000000000-00000000000000001234/title.offsets.npy
+
+Runs are incremental: _export_state.json records the last exported id of
+each table, and the next run only exports newer rows. A run writes its parts
+under <output>/_tmp-<table>-<part>/ and moves them into place only once the
+state file records them, so readers never see the parts of a failed run. The
+next run removes such leftovers, or finishes moving them if the state file
+was already updated. Rows updated after
+being exported are not exported again; use a full export for that.
+Missing values become 0 for year, NaN for rating, NaT for created_at and
+the empty string for text.
+"""
+import json
+import os
+import shutil
+from itertools import groupby
+from typing import Dict, List
+import numpy as np
+from app.extensions import db
+from app.models.models import User, Movie
+
+STATE_FILE = '_export_state.json'
+STAGING_PREFIX = '_tmp-'
+
+# Every .npy file gets a header of this size, rewritten with the final row count on close
+HEADER_SIZE = 128
+
+PARTITION_FORMATS = {
+	'day': '%Y-%m-%d',
+	'month': '%Y-%m',
+}
+
+# Exported columns per table, with their NumPy dtype (None for strings)
+TABLES = {
+	'users': (User, [
+		('id', np.int64),
+		('name', None),
+		('created_at', 'M8[us]'),
+	]),
+	'movies': (Movie, [
+		('id', np.int64),
+		('title', None),
+		('director', None),
+		('year', np.int32),
+		('rating', np.float64),
+		('poster_url', None),
+		('user_id', np.int64),
+		('created_at', 'M8[us]'),
+	]),
+}
+
+MISSING = {
+	np.int32: 0,
+	np.int64: 0,
+	np.float64: np.nan,
+	'M8[us]': None,
+	None: '',
+}
+
+
+class NpyWriter:
+	"""Append-only writer of a one-dimensional .npy file."""
+
+	def __init__(self, path: str, dtype):
+		self.dtype = np.dtype(dtype)
+		self.length = 0
+		self.file = open(path, 'wb')
+		self.file.write(self._header())
+
+	def _header(self) -> bytes:
+		header = repr({
+			'descr': np.lib.format.dtype_to_descr(self.dtype),
+			'fortran_order': False,
+			'shape': (self.length,),
+		})
+		# Format 1.0 stores the header length as a little-endian uint16, whatever the platform
+		prefix = np.lib.format.magic(1, 0) + np.array(HEADER_SIZE - 10, dtype='<u2').tobytes()
+		return prefix + header.ljust(HEADER_SIZE - len(prefix) - 1).encode('latin1') + b'\n'
+
+	def append(self, values: np.ndarray) -> None:
+		self.file.write(np.ascontiguousarray(values, dtype=self.dtype).tobytes())
+		self.length += len(values)
+
+	def close(self) -> None:
+		self.file.seek(0)
+		self.file.write(self._header())
+		self.file.close()
+
+
+class StringWriter:
+	"""Writer of a string column as offsets and UTF-8 data .npy files."""
+
+	def __init__(self, path: str):
+		self.offsets = NpyWriter(f'{path}.offsets.npy', np.int64)
+		self.data = NpyWriter(f'{path}.data.npy', np.uint8)
+		self.offsets.append(np.zeros(1, dtype=np.int64))
+
+	def append(self, values: List[str]) -> None:
+		encoded = [value.encode('utf-8') for value in values]
+		lengths = np.fromiter((len(value) for value in encoded), dtype=np.int64, count=len(encoded))
+		self.offsets.append(self.data.length + np.cumsum(lengths))
+		self.data.append(np.frombuffer(b''.join(encoded), dtype=np.uint8))
+
+	def close(self) -> None:
+		self.offsets.close()
+		self.data.close()
+
+
+class PartWriter:
+	"""Writers for every column of one part of a partition."""
+
+	def __init__(self, path: str, columns):
+		os.makedirs(path)
+		self.columns = columns
+		self.writers = [
+			StringWriter(os.path.join(path, name)) if dtype is None
+			else NpyWriter(os.path.join(path, f'{name}.npy'), dtype)
+			for name, dtype in columns
+		]
+
+	def append(self, rows) -> None:
+		for index, ((name, dtype), writer) in enumerate(zip(self.columns, self.writers)):
+			missing = MISSING[dtype]
+			values = [missing if row[index] is None else row[index] for row in rows]
+			writer.append(values if dtype is None else np.array(values, dtype=dtype))
+
+	def close(self) -> None:
+		for writer in self.writers:
+			writer.close()
+
+
+def load_state(output_dir: str) -> Dict[str, int]:
+	"""Return the last exported id of each table."""
+	try:
+		with open(os.path.join(output_dir, STATE_FILE)) as f:
+			return json.load(f)
+	except (OSError, ValueError):
+		return {}
+
+
+def export_table(output_dir: str, table: str, after_id: int = 0, partition: str = 'day',
+				 chunk_size: int = 10000) -> Dict[str, int]:
+	"""
+	Export the rows of a table with an id greater than after_id.
+	The parts are written to a staging directory; see publish_parts.
+	Args:
+		output_dir (str): Root directory of the export
+		table (str): Name of the table, a key of TABLES
+		after_id (int): Last id exported by the previous run
+		partition (str): Partition granularity, a key of PARTITION_FORMATS
+		chunk_size (int): Number of rows fetched from the cursor at once
+	Returns:
+		dict: Number of rows and partitions written, the last exported id and
+		the staging directory of the parts (None if there were no new rows)
+	"""
+	if chunk_size < 1:
+		raise ValueError(f'chunk_size must be at least 1, got {chunk_size}')
+	model, columns = TABLES[table]
+	date_format = PARTITION_FORMATS[partition]
+	last_id = db.session.query(db.func.max(model.id)).scalar() or 0
+	if last_id <= after_id:
+		return {'rows': 0, 'partitions': 0, 'last_id': after_id, 'staging_dir': None}
+
+	query = (db.select(*[getattr(model, name) for name, _ in columns])
+			 .where(model.id > after_id, model.id <= last_id)
+			 .order_by(model.created_at, model.id))
+	result = db.session.connection().execution_options(stream_results=True).execute(query)
+
+	created_index = [name for name, _ in columns].index('created_at')
+	part_name = f'part-{after_id + 1:020d}-{last_id:020d}'
+	staging_dir = os.path.join(output_dir, f'{STAGING_PREFIX}{table}-{part_name}')
+	rows_written = 0
+	partitions = set()
+	writer = None
+	current = None
+
+	def partition_of(row):
+		created_at = row[created_index]
+		return created_at.strftime(date_format) if created_at else 'unknown'
+
+	try:
+		for chunk in result.partitions(chunk_size):
+			for key, rows in groupby(chunk, key=partition_of):
+				if key != current:
+					if writer:
+						writer.close()
+					writer = PartWriter(os.path.join(staging_dir, f'created={key}'), columns)
+					current = key
+					partitions.add(key)
+				rows = list(rows)
+				writer.append(rows)
+				rows_written += len(rows)
+	finally:
+		if writer:
+			writer.close()
+		result.close()
+
+	if not rows_written:
+		# The new rows were deleted meanwhile: nothing was staged, so nothing is recorded
+		return {'rows': 0, 'partitions': 0, 'last_id': after_id, 'staging_dir': None}
+	return {'rows': rows_written, 'partitions': len(partitions), 'last_id': last_id, 'staging_dir': staging_dir}
+
+
+def publish_parts(output_dir: str, table: str, staging_dir: str) -> None:
+	"""Move the parts of a staging directory into their partitions."""
+	part_name = os.path.basename(staging_dir)[len(f'{STAGING_PREFIX}{table}-'):]
+	for partition in os.listdir(staging_dir):
+		partition_dir = os.path.join(output_dir, table, partition)
+		os.makedirs(partition_dir, exist_ok=True)
+		os.rename(os.path.join(staging_dir, partition), os.path.join(partition_dir, part_name))
+	os.rmdir(staging_dir)
+
+
+def recover_staging(output_dir: str, table: str, last_id: int) -> None:
+	"""
+	Clean up the staging directories left by an interrupted run.
+	Parts already recorded in the state file are published, the others removed.
+	"""
+	prefix = f'{STAGING_PREFIX}{table}-part-'
+	for name in os.listdir(output_dir):
+		if not name.startswith(prefix):
+			continue
+		staging_dir = os.path.join(output_dir, name)
+		if int(name.rsplit('-', 1)[1]) <= last_id:
+			publish_parts(output_dir, table, staging_dir)
+		else:
+			shutil.rmtree(staging_dir)
+
+
+def export_tables(output_dir: str, tables=tuple(TABLES), full: bool = False, partition: str = 'day',
+				  chunk_size: int = 10000) -> Dict[str, Dict[str, int]]:
+	"""
+	Export tables incrementally and record the last exported ids.
+	Args:
+		output_dir (str): Root directory of the export
+		tables (tuple): Names of the tables to export
+		full (bool): Delete the previous export of the tables and export every row
+		partition (str): Partition granularity, a key of PARTITION_FORMATS
+		chunk_size (int): Number of rows fetched from the cursor at once
+	Returns:
+		dict: The export_table statistics of each table
+	"""
+	os.makedirs(output_dir, exist_ok=True)
+	state = load_state(output_dir)
+	stats = {}
+
+	for table in tables:
+		if full:
+			shutil.rmtree(os.path.join(output_dir, table), ignore_errors=True)
+			state.pop(table, None)
+		recover_staging(output_dir, table, state.get(table, 0))
+
+		stats[table] = export_table(output_dir, table, state.get(table, 0), partition, chunk_size)
+		state[table] = stats[table]['last_id']
+
+		# Record progress after each table, so a failed run does not export it twice
+		state_path = os.path.join(output_dir, STATE_FILE)
+		with open(f'{state_path}.tmp', 'w') as f:
+			json.dump(state, f, indent=2)
+		os.replace(f'{state_path}.tmp', state_path)
+
+		if stats[table]['staging_dir']:
+			publish_parts(output_dir, table, stats[table]['staging_dir'])
+
+	return stats
@@ -1,6 +1,5 @@
-import requests
 from flask import current_app
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 
 class OMDbService:
 	"""Service for interacting with the OMDb API.
@@ -38,6 +37,9 @@ class OMDbService:
 			'plot': 'short'
 		}
 		
+		# Imported here to keep requests off the application's import path
+		import requests
+		
 		try:
 			response = requests.get(base_url, params=params)
 			response.raise_for_status()
@@ -64,4 +66,46 @@ class OMDbService:
 			return None
 		except Exception as e:
 			current_app.logger.error(f"Error fetching movie data from OMDb: {str(e)}")
-			return None 
\ No newline at end of file
+			return None 
+	@staticmethod
+	def search_titles(query: str) -> Optional[List[str]]:
+		"""
+		Search for movie titles matching a query using the OMDb API.
+		
+		Unlike search_movie, this uses OMDb's `s=` search, which returns a list
+		of partial matches rather than a single exact title match.
+		
+		Args:
+			query: The (partial) movie title to search for
+			
+		Returns:
+			List of matching movie titles, empty if OMDb has no match.
+			Returns None if an error occurs, e.g. a timeout
+			
+		Raises:
+			No exceptions are raised. All errors are logged and None is returned.
+		"""
+		api_key = current_app.config['OMDB_API_KEY']
+		base_url = current_app.config['OMDB_API_URL']
+		
+		params = {
+			'apikey': api_key,
+			's': query,
+			'type': 'movie'
+		}
+		
+		# Imported here to keep requests off the application's import path
+		import requests
+		
+		try:
+			# Keep autocomplete responsive when OMDb is slow
+			response = requests.get(base_url, params=params, timeout=current_app.config['SUGGEST_OMDB_TIMEOUT'])
+			response.raise_for_status()
+			data = response.json()
+			
+			if data.get('Response') == 'True':
+				return [item['Title'] for item in data.get('Search', []) if item.get('Title')]
+			return []
+		except Exception as e:
+			current_app.logger.error(f"Error searching titles on OMDb: {str(e)}")
+			return None
@@ -0,0 +1,153 @@
+"""Offline builder for the "users who have this also have" recommendations.
+
+All collections are loaded into a sparse user x title matrix, and item-item
+cosine similarities are computed with sparse matrix products, a chunk of
+titles at a time. The top-k similar titles of each title are written to the
+movie_similarities table, so serving a recommendation is one indexed read.
+
+Incremental builds only recompute the titles recorded in recommendation_changes
+and the titles sharing a collection with them. Scores of other titles still
+reflect the previous build until the next full build.
+"""
+from typing import Dict, Iterator, Tuple
+import numpy as np
+from scipy import sparse
+from app.extensions import db
+from app.models.models import Movie, MovieSimilarity, RecommendationChange, normalize_title
+
+# Maximum number of bound parameters per IN (...) clause
+SQL_CHUNK_SIZE = 500
+
+
+class Collections:
+	"""All users' collections as a binary user x title matrix.
+
+	Attributes:
+		matrix: CSR matrix with a 1 where a user has a title
+		keys: Normalized title of each column
+		titles: Display title of each column, as first entered by any user
+	"""
+
+	def __init__(self, user_ids: np.ndarray, titles: np.ndarray):
+		"""Build the matrix from parallel arrays of user ids and titles."""
+		keys = np.array([normalize_title(title) for title in titles], dtype=object)
+		self.keys, first_index, item_codes = np.unique(keys, return_index=True, return_inverse=True)
+		self.titles = titles[first_index]
+		users, user_codes = np.unique(user_ids, return_inverse=True)
+
+		matrix = sparse.csr_matrix(
+			(np.ones(len(item_codes), dtype=np.float32), (user_codes, item_codes.ravel())),
+			shape=(len(users), len(self.keys))
+		)
+		# Users entering the same title twice still count once
+		matrix.data[:] = 1
+		self.matrix = matrix
+
+	@classmethod
+	def load(cls) -> 'Collections':
+		"""Load every user's collection from the database."""
+		rows = db.session.query(Movie.user_id, Movie.title).order_by(Movie.id).all()
+		user_ids = np.fromiter((user_id for user_id, _ in rows), dtype=np.int64, count=len(rows))
+		titles = np.array([title for _, title in rows], dtype=object)
+		return cls(user_ids, titles)
+
+	def related_items(self, items: np.ndarray) -> np.ndarray:
+		"""Return the items plus every item sharing a collection with one of them."""
+		users = np.unique(self.matrix[:, items].nonzero()[0])
+		related = np.unique(self.matrix[users].nonzero()[1])
+		return np.union1d(items, related)
+
+
+def top_k_similar(collections: Collections, items: np.ndarray, top_k: int,
+				  min_cooccurrence: int = 1, chunk_size: int = 1024) -> Iterator[Tuple[np.ndarray, ...]]:
+	"""
+	Compute the top_k most similar titles of the given items.
+	Similarity is the cosine between the items' user columns, i.e. the number
+	of users having both titles divided by the geometric mean of their counts.
+	Args:
+		collections (Collections): The user x title matrix
+		items (np.ndarray): Column indices of the items to compute
+		top_k (int): Number of similar titles kept per item
+		min_cooccurrence (int): Minimum number of users having both titles
+		chunk_size (int): Number of items whose similarities are held in memory at once
+	Yields:
+		tuple: Arrays (item, similar_item, score, rank), one entry per kept pair
+	"""
+	matrix = collections.matrix
+	by_item = matrix.T.tocsr()
+	counts = np.asarray(matrix.sum(axis=0)).ravel()
+
+	for start in range(0, len(items), chunk_size):
+		chunk = items[start:start + chunk_size]
+		cooccurrence = (by_item[chunk] @ matrix).tocoo()
+		rows = chunk[cooccurrence.row]
+		cols = cooccurrence.col
+		together = cooccurrence.data
+
+		keep = (rows != cols) & (together >= min_cooccurrence)
+		rows, cols, together = rows[keep], cols[keep], together[keep]
+		scores = together / np.sqrt(counts[rows] * counts[cols])
+
+		# Sort by item, then by descending score, and rank within each item
+		order = np.lexsort((cols, -scores, rows))
+		rows, cols, scores = rows[order], cols[order], scores[order]
+		ranks = np.arange(len(rows)) - np.searchsorted(rows, rows, side='left')
+
+		keep = ranks < top_k
+		yield rows[keep], cols[keep], scores[keep], ranks[keep]
+
+
+def build_recommendations(full: bool = False, top_k: int = 10, min_cooccurrence: int = 1,
+						  chunk_size: int = 1024) -> Dict[str, int]:
+	"""
+	Rebuild the movie_similarities lookup table.
+	Args:
+		full (bool): Recompute every title instead of only the changed ones
+		top_k (int): Number of similar titles kept per title
+		min_cooccurrence (int): Minimum number of users having both titles
+		chunk_size (int): Number of titles computed at once
+	Returns:
+		dict: Number of titles in the collections, titles recomputed and similarities written
+	"""
+	last_change = db.session.query(db.func.max(RecommendationChange.id)).scalar() or 0
+	changed_keys = set()
+	if not full:
+		changed_keys = {
+			key for (key,) in db.session.query(RecommendationChange.title_key)
+			.filter(RecommendationChange.id <= last_change)
+			.distinct()
+		}
+
+	collections = Collections.load()
+	if full:
+		items = np.arange(len(collections.keys))
+	else:
+		changed_items = np.flatnonzero(np.isin(collections.keys, list(changed_keys)))
+		items = collections.related_items(changed_items)
+
+	# Replace the rows of every recomputed title, including titles no longer in any collection
+	if full:
+		MovieSimilarity.query.delete()
+	else:
+		stale_keys = sorted(changed_keys.union(collections.keys[items]))
+		for start in range(0, len(stale_keys), SQL_CHUNK_SIZE):
+			MovieSimilarity.query.filter(
+				MovieSimilarity.title_key.in_(stale_keys[start:start + SQL_CHUNK_SIZE])
+			).delete(synchronize_session=False)
+
+	written = 0
+	for rows, cols, scores, ranks in top_k_similar(collections, items, top_k, min_cooccurrence, chunk_size):
+		if not len(rows):
+			continue
+		db.session.execute(MovieSimilarity.__table__.insert(), [
+			{'title_key': key, 'similar_title': title, 'score': score, 'rank': rank}
+			for key, title, score, rank in zip(
+				collections.keys[rows], collections.titles[cols], scores.tolist(), ranks.tolist()
+			)
+		])
+		written += len(rows)
+
+	RecommendationChange.query.filter(RecommendationChange.id <= last_change).delete()
+	db.session.commit()
+
+	return {'titles': len(collections.keys), 'recomputed': len(items), 'similarities': written}
@@ -0,0 +1,115 @@
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from typing import Iterable, List
+from app.models.models import normalize_title
+
+
+class TitleIndex:
+	"""In-memory prefix index of movie titles.
+
+	Titles are kept in a sorted list of (normalized key, display title) pairs,
+	so a prefix lookup is a single bisect followed by a short forward scan.
+	The index is bounded: once it holds max_entries titles, new titles are
+	ignored until the index is rebuilt.
+	"""
+
+	normalize = staticmethod(normalize_title)
+
+	def __init__(self, max_entries: int = 50000):
+		"""Initialize an empty index holding at most max_entries titles."""
+		self.max_entries = max_entries
+		self._entries = []
+		self._keys = set()
+		self._lock = threading.Lock()
+
+	def __len__(self) -> int:
+		return len(self._entries)
+
+	def rebuild(self, titles: Iterable[str]) -> None:
+		"""Replace the index contents with the given titles."""
+		entries = {}
+		for title in titles:
+			if len(entries) >= self.max_entries:
+				break
+			if not title:
+				continue
+			entries.setdefault(self.normalize(title), title)
+
+		with self._lock:
+			self._entries = sorted(entries.items())
+			self._keys = set(entries)
+
+	def add(self, title: str) -> bool:
+		"""
+		Add a title to the index.
+
+		Returns:
+			bool: True if the title was added, False if it was empty,
+			already present, or the index is full
+		"""
+		if not title:
+			return False
+
+		key = self.normalize(title)
+		with self._lock:
+			if key in self._keys or len(self._entries) >= self.max_entries:
+				return False
+			insort(self._entries, (key, title))
+			self._keys.add(key)
+			return True
+
+	def search(self, prefix: str, limit: int = 10) -> List[str]:
+		"""Return up to limit titles starting with prefix, in alphabetical order."""
+		key = self.normalize(prefix)
+		if not key:
+			return []
+
+		results = []
+		with self._lock:
+			entries = self._entries
+			i = bisect_left(entries, (key,))
+			while i < len(entries) and len(results) < limit:
+				entry_key, title = entries[i]
+				if not entry_key.startswith(key):
+					break
+				results.append(title)
+				i += 1
+		return results
+
+
+class MissCache:
+	"""Bounded cache of queries that OMDb had no titles for.
+
+	Remembered misses expire after ttl seconds, and the least recently used
+	miss is dropped once max_entries queries are held.
+	"""
+
+	def __init__(self, max_entries: int = 1024, ttl: float = 3600):
+		"""Initialize an empty cache."""
+		self.max_entries = max_entries
+		self.ttl = ttl
+		self._misses = OrderedDict()
+		self._lock = threading.Lock()
+
+	def add(self, query: str) -> None:
+		"""Remember that a query had no results."""
+		key = normalize_title(query)
+		with self._lock:
+			self._misses[key] = time.monotonic() + self.ttl
+			self._misses.move_to_end(key)
+			while len(self._misses) > self.max_entries:
+				self._misses.popitem(last=False)
+
+	def __contains__(self, query: str) -> bool:
+		key = normalize_title(query)
+		with self._lock:
+			expires_at = self._misses.get(key)
+			if expires_at is None:
+				return False
+			if expires_at < time.monotonic():
+				del self._misses[key]
+				return False
+			self._misses.move_to_end(key)
+			return True
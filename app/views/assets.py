@@ -0,0 +1,49 @@
+import mimetypes
+import os
+from flask import Blueprint, request, current_app, abort, send_from_directory
+
+# Blueprint serving the fingerprinted assets produced by build_assets.py
+assets_bp = Blueprint('assets', __name__)
+
+# Precompressed variants, in order of preference
+PRECOMPRESSED_ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+@assets_bp.route('/assets/<path:filename>')
+def asset(filename):
+	"""Serve a fingerprinted asset
+
+	Only files listed in the asset manifest are served. When the client accepts
+	it and the build produced one, a precompressed variant is sent instead of
+	the original file. Fingerprinted filenames change whenever their content
+	does, so responses are cacheable forever.
+
+	Args:
+		filename: The fingerprinted filename of the asset
+
+	Returns:
+		The asset file, or a 404 error if the asset is unknown
+	"""
+	if filename not in current_app.config['asset_manifest'].values():
+		abort(404)
+
+	dist_path = current_app.config['ASSET_DIST_PATH']
+	path = filename
+	encoding = None
+	for candidate, extension in PRECOMPRESSED_ENCODINGS:
+		if candidate in request.accept_encodings and os.path.isfile(os.path.join(dist_path, filename + extension)):
+			path = filename + extension
+			encoding = candidate
+			break
+
+	response = send_from_directory(
+		dist_path,
+		path,
+		mimetype=mimetypes.guess_type(filename)[0],
+		max_age=current_app.config['ASSET_MAX_AGE']
+	)
+	if encoding:
+		response.headers['Content-Encoding'] = encoding
+	response.headers['Vary'] = 'Accept-Encoding'
+	response.headers['Cache-Control'] = f"public, max-age={current_app.config['ASSET_MAX_AGE']}, immutable"
+	return response
@@ -1,11 +1,17 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, abort
+import gzip
+import zlib
+from flask import Blueprint, Response, render_template, request, redirect, url_for, flash, current_app, abort, jsonify, get_flashed_messages, stream_with_context, g
 from datetime import datetime
-from app.controllers.sqlite_data_manager import SQLiteDataManager
+from markupsafe import escape
+from werkzeug.exceptions import TooManyRequests, ServiceUnavailable
+from werkzeug.local import LocalProxy
+from app.limiter import RATE_LIMITED
 from app.services.omdb_service import OMDbService
 
 # Create a Blueprint for our routes
 main_bp = Blueprint('main', __name__)
-data_manager = SQLiteDataManager()
+# The data manager created by create_app
+data_manager = LocalProxy(lambda: current_app.config['data_manager'])
 
 def register_error_handlers(app):
 	"""Register error handlers at the application level"""
@@ -29,6 +35,117 @@ def register_error_handlers(app):
 		"""Handle 405 Method Not Allowed errors"""
 		return render_template('405.html'), 405
 
+	@app.errorhandler(429)
+	def too_many_requests(e):
+		"""Handle 429 Too Many Requests errors"""
+		headers = {'Retry-After': str(e.retry_after)} if e.retry_after else {}
+		return render_template('429.html', retry_after=e.retry_after or 1), 429, headers
+		
+	@app.errorhandler(503)
+	def service_unavailable(e):
+		"""Handle 503 Service Unavailable errors"""
+		headers = {'Retry-After': str(e.retry_after)} if e.retry_after else {}
+		return render_template('503.html', retry_after=e.retry_after or 1), 503, headers
+
+def stream_template(template_name, error_message='An error occurred while loading this page.', **context):
+	"""Render a template as a streamed response
+	
+	The template is sent to the client in chunks as it renders, so the first
+	bytes go out before the whole page has been generated. Flashed messages are
+	read up front because the session can no longer be updated once the
+	response headers have been sent. For the same reason, an error raised while
+	rendering cannot become an error page: it is logged and the page is ended
+	with error_message instead.
+	"""
+	get_flashed_messages(with_categories=True)
+	current_app.update_template_context(context)
+	template = current_app.jinja_env.get_template(template_name)
+	stream = template.stream(context)
+	stream.enable_buffering(current_app.config['STREAM_BUFFER_SIZE'])
+	
+	def generate():
+		try:
+			yield from stream
+		except Exception as e:
+			current_app.logger.error(f"Error while streaming {template_name}: {str(e)}")
+			yield (
+				'<div class="alert alert-danger mt-4" role="alert">'
+				f'<i class="fas fa-exclamation-triangle"></i> {escape(error_message)}'
+				'</div></body></html>'
+			)
+	
+	return Response(stream_with_context(generate()))
+
+def gzip_stream(chunks, level):
+	"""Gzip a streamed response, flushing after each chunk so nothing is held back"""
+	compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+	try:
+		for chunk in chunks:
+			if isinstance(chunk, str):
+				chunk = chunk.encode('utf-8')
+			data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+			if data:
+				yield data
+		yield compressor.flush()
+	finally:
+		if hasattr(chunks, 'close'):
+			chunks.close()
+
+@main_bp.before_request
+def admit_request():
+	"""Apply the admission limits of the requested route
+	
+	Only the methods listed in the route's limits are limited, so e.g. the
+	forms of routes that change data are always served. Rejected requests fail
+	fast with 429 (client over its rate) or 503 (no free slot within the queue
+	budget) and a Retry-After header.
+	"""
+	limiter = current_app.config['limiter']
+	limit = limiter.limits.get(request.endpoint)
+	if limit is None or request.method not in limit['methods']:
+		return
+	
+	slot_id, outcome, retry_after = limiter.acquire(request.endpoint, request.remote_addr or 'unknown')
+	if slot_id is None:
+		if outcome == RATE_LIMITED:
+			raise TooManyRequests(retry_after=retry_after)
+		raise ServiceUnavailable(retry_after=retry_after)
+	g.admission_slot = slot_id
+
+@main_bp.teardown_request
+def release_admission(exc):
+	"""Free the admission slot taken by the request, if any"""
+	slot_id = g.pop('admission_slot', None)
+	if slot_id is not None:
+		current_app.config['limiter'].release(slot_id)
+
+@main_bp.after_request
+def compress_response(response):
+	"""Gzip streamed HTML responses and those above the configured size threshold"""
+	if (response.status_code != 200
+			or response.direct_passthrough
+			or response.mimetype != 'text/html'
+			or 'Content-Encoding' in response.headers
+			or 'gzip' not in request.accept_encodings):
+		return response
+	
+	if response.is_streamed:
+		# The size is unknown up front, so streamed pages are always compressed
+		response.response = gzip_stream(response.response, current_app.config['COMPRESS_LEVEL'])
+		response.headers['Content-Encoding'] = 'gzip'
+		response.headers.pop('Content-Length', None)
+		response.vary.add('Accept-Encoding')
+		return response
+	
+	data = response.get_data()
+	if len(data) < current_app.config['COMPRESS_MIN_SIZE']:
+		return response
+	
+	response.set_data(gzip.compress(data, compresslevel=current_app.config['COMPRESS_LEVEL']))
+	response.headers['Content-Encoding'] = 'gzip'
+	response.vary.add('Accept-Encoding')
+	return response
+
 @main_bp.route('/')
 def home():
 	"""Home page route"""
@@ -49,11 +166,19 @@ def user_movies(user_id):
 			flash('User not found!', 'error')
 			abort(404)
 			
-		movies = data_manager.get_user_movies(user_id)
-		if not movies:
+		has_movies = data_manager.has_movies(user_id)
+		if not has_movies:
 			flash('No movies found for this user. Add some movies to get started!', 'info')
-			
-		return render_template('user_movies.html', user=user, movies=movies)
+		
+		# Movies are fetched in batches while the page streams out
+		movies = data_manager.iter_user_movies(user_id, batch_size=current_app.config['MOVIES_BATCH_SIZE'])
+		return stream_template(
+			'user_movies.html',
+			error_message='An error occurred while loading the user\'s movies.',
+			user=user,
+			movies=movies,
+			has_movies=has_movies
+		)
 	except Exception as e:
 		flash('An error occurred while loading the user\'s movies.', 'error')
 		current_app.logger.error(f"Error in user_movies route: {str(e)}")
@@ -114,6 +239,7 @@ def add_movie(user_id):
 				poster_url=movie_data['poster_url']
 			)
 			if movie:
+				current_app.config['title_index'].add(movie.title)
 				flash('Movie added successfully using OMDb data!', 'success')
 			else:
 				flash('Error adding movie', 'error')
@@ -145,6 +271,7 @@ def add_movie(user_id):
 					poster_url=''  # No poster URL for manually added movies
 				)
 				if movie:
+					current_app.config['title_index'].add(movie.title)
 					flash('Movie added successfully!', 'success')
 				else:
 					flash('Error adding movie', 'error')
@@ -212,6 +339,7 @@ def update_movie(user_id, movie_id):
 				)
 				
 				if movie:
+					current_app.config['title_index'].add(movie.title)
 					flash('Movie updated successfully!', 'success')
 					return redirect(url_for('main.user_movies', user_id=user_id))
 				else:
@@ -264,6 +392,86 @@ def delete_user(user_id):
     
     return redirect(url_for('main.list_users'))
 
+@main_bp.route('/api/suggest')
+def suggest_titles():
+	"""Suggest movie titles for the autocomplete on the movie forms
+	
+	Titles are looked up by prefix in the in-memory title index. If the index
+	has no match and the query is long enough, OMDb's search is used instead
+	and its results are added to the index for subsequent lookups. Queries
+	OMDb had nothing for are remembered for a while and not sent again.
+	
+	Returns:
+		JSON object with the query, the source of the suggestions
+		('local' or 'omdb') and the list of suggested titles
+	"""
+	query = request.args.get('q', '').strip()
+	limit = current_app.config['SUGGEST_MAX_RESULTS']
+	title_index = current_app.config['title_index']
+	
+	suggestions = title_index.search(query, limit=limit)
+	source = 'local'
+	
+	misses = current_app.config['suggest_misses']
+	if not suggestions and len(query) >= current_app.config['SUGGEST_OMDB_MIN_LENGTH'] and query not in misses:
+		source = 'omdb'
+		titles = OMDbService.search_titles(query)
+		if titles is None:
+			# OMDb failed: answer with no suggestions, but ask again next time
+			titles = []
+		elif not titles:
+			misses.add(query)
+		for title in titles:
+			title_index.add(title)
+			if title not in suggestions:
+				suggestions.append(title)
+		suggestions = suggestions[:limit]
+	
+	return jsonify({'query': query, 'source': source, 'suggestions': suggestions})
+
+@main_bp.route('/api/similar')
+def similar_movies():
+	"""Recommend movies found in the same collections as a given title
+	
+	Recommendations are precomputed by `flask build-recommendations`, so this
+	is a single indexed lookup. When a user_id is given, titles that user
+	already has are left out.
+	
+	Returns:
+		JSON object with the title and the list of similar titles with their scores
+	"""
+	title = request.args.get('title', '').strip()
+	user_id = request.args.get('user_id', type=int)
+	similar = data_manager.get_similar_movies(
+		title,
+		limit=current_app.config['RECOMMENDATIONS_TOP_K'],
+		exclude_user_id=user_id
+	) if title else []
+	return jsonify({'title': title, 'similar': [similarity.to_dict() for similarity in similar]})
+
+@main_bp.route('/metrics')
+def metrics():
+	"""Expose the admission control saturation in the Prometheus text format"""
+	snapshot = current_app.config['limiter'].snapshot()
+	lines = []
+	for name, kind, description, value in (
+		('in_flight', 'gauge', 'Requests currently being handled', lambda route: route['in_flight']),
+		('concurrency_limit', 'gauge', 'Maximum requests handled at once', lambda route: route['concurrency']),
+		('saturation', 'gauge', 'In-flight requests as a fraction of the limit', lambda route: route['saturation']),
+	):
+		lines.append(f'# HELP moviweb_admission_{name} {description}')
+		lines.append(f'# TYPE moviweb_admission_{name} {kind}')
+		lines.extend(f'moviweb_admission_{name}{{route="{route}"}} {value(stats)}' for route, stats in snapshot.items())
+	
+	lines.append('# HELP moviweb_admission_requests_total Limited requests by outcome')
+	lines.append('# TYPE moviweb_admission_requests_total counter')
+	for route, stats in snapshot.items():
+		lines.extend(
+			f'moviweb_admission_requests_total{{route="{route}",outcome="{outcome}"}} {count}'
+			for outcome, count in stats['requests'].items()
+		)
+	return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
 @main_bp.route('/simulate-error')
 def simulate_error():
 	"""Route to simulate a 500 error for testing"""
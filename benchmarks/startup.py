@@ -0,0 +1,79 @@
+"""Measure import time and time-to-first-request of a fresh process.
+
+Each run starts a new interpreter that imports the app package, creates the
+app with the production configuration against an existing database, and
+serves a first request to the home page. The median of several runs is
+reported.
+
+Usage:
+	python benchmarks/startup.py [--runs 10]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def measure(database_path, cache_path):
+	"""Boot the app once and print the timings as JSON"""
+	start = time.perf_counter()
+	sys.path.insert(0, ROOT)
+	import app
+	from config.config import config, ProductionConfig
+	imported = time.perf_counter()
+
+	class BenchmarkConfig(ProductionConfig):
+		SQLALCHEMY_DATABASE_URI = f'sqlite:///{database_path}'
+		JINJA_BYTECODE_CACHE_DIR = cache_path
+
+	config['benchmark'] = BenchmarkConfig
+	application = app.create_app('benchmark')
+	created = time.perf_counter()
+	response = application.test_client().get('/')
+	assert response.status_code == 200
+	served = time.perf_counter()
+
+	print(json.dumps({
+		'import': imported - start,
+		'create_app': created - imported,
+		'first_request': served - created,
+		'total': served - start
+	}))
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument('--runs', type=int, default=10)
+	parser.add_argument('--measure', nargs=2, metavar=('DATABASE', 'CACHE'))
+	args = parser.parse_args()
+
+	if args.measure:
+		measure(*args.measure)
+		return
+
+	with tempfile.TemporaryDirectory() as tmp:
+		command = [
+			sys.executable, __file__, '--measure',
+			os.path.join(tmp, 'benchmark.db'),
+			os.path.join(tmp, 'jinja_cache')
+		]
+		# The first boot creates the database and fills the template cache
+		subprocess.run(command, check=True, capture_output=True)
+
+		runs = []
+		for _ in range(args.runs):
+			output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+			runs.append(json.loads(output.strip().splitlines()[-1]))
+
+	for key in ('import', 'create_app', 'first_request', 'total'):
+		print(f'{key:<14} {statistics.median(run[key] for run in runs) * 1000:8.1f} ms')
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,118 @@
+"""Measure time-to-first-byte and peak RSS of the user_movies page.
+
+Compares the previous buffered rendering (all movies loaded with .all() and the
+page rendered into a single string) against the streamed response, for a user
+with a large collection. Each mode runs in a fresh process so that peak RSS
+reflects that mode alone.
+
+Usage:
+	python benchmarks/user_movies_streaming.py [--movies 50000]
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import render_template
+from app import create_app
+from app.extensions import db
+from app.models.models import User, Movie
+from config.config import config, TestingConfig
+
+
+def make_app(database_path):
+	"""Create an app bound to the benchmark database"""
+	class BenchmarkConfig(TestingConfig):
+		SQLALCHEMY_DATABASE_URI = f'sqlite:///{database_path}'
+		SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+	config['benchmark'] = BenchmarkConfig
+	return create_app('benchmark')
+
+
+def seed(database_path, movie_count):
+	"""Create one user owning movie_count movies"""
+	app = make_app(database_path)
+	with app.app_context():
+		user = User()
+		user.name = 'Benchmark User'
+		db.session.add(user)
+		db.session.commit()
+		db.session.execute(Movie.__table__.insert(), [
+			{
+				'title': f'Movie {i}',
+				'director': f'Director {i % 500}',
+				'year': 1950 + i % 70,
+				'rating': (i % 100) / 10,
+				'poster_url': f'https://example.com/posters/{i}.jpg',
+				'user_id': user.id
+			}
+			for i in range(movie_count)
+		])
+		db.session.commit()
+		return user.id
+
+
+def measure(database_path, mode, user_id):
+	"""Request the page once and print TTFB, total time and peak RSS for mode"""
+	app = make_app(database_path)
+	data_manager = app.config['data_manager']
+
+	def buffered_user_movies(user_id):
+		"""The user_movies view before streaming was introduced"""
+		user = data_manager.get_user(user_id)
+		movies = Movie.query.filter_by(user_id=user_id).all()
+		return render_template('user_movies.html', user=user, movies=movies, has_movies=bool(movies))
+
+	app.add_url_rule('/buffered/<int:user_id>', view_func=buffered_user_movies)
+	url = f'/buffered/{user_id}' if mode == 'buffered' else f'/users/{user_id}/movies'
+
+	client = app.test_client()
+	baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	start = time.perf_counter()
+	response = client.get(url, buffered=False)
+	chunks = iter(response.response)
+	size = len(next(chunks))
+	ttfb = time.perf_counter() - start
+	for chunk in chunks:
+		size += len(chunk)
+	total = time.perf_counter() - start
+	response.close()
+	peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+	print(f'{mode:<10} ttfb={ttfb * 1000:8.1f} ms  total={total * 1000:8.1f} ms  '
+		  f'body={size / 1e6:6.1f} MB  peak_rss_growth={(peak_rss - baseline_rss) / 1024:7.1f} MB')
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument('--movies', type=int, default=50000)
+	parser.add_argument('--mode', choices=['buffered', 'streaming'])
+	parser.add_argument('--database')
+	parser.add_argument('--user-id', type=int)
+	args = parser.parse_args()
+
+	if args.mode:
+		measure(args.database, args.mode, args.user_id)
+		return
+
+	with tempfile.TemporaryDirectory() as tmp:
+		database_path = os.path.join(tmp, 'benchmark.db')
+		user_id = seed(database_path, args.movies)
+		print(f'user_movies page for a user with {args.movies} movies')
+		for mode in ('buffered', 'streaming'):
+			subprocess.run([
+				sys.executable, __file__,
+				'--mode', mode,
+				'--database', database_path,
+				'--user-id', str(user_id)
+			], check=True)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,166 @@
+"""Vendor, subset, fingerprint and precompress the third-party static assets.
+
+Downloads Bootstrap and Font Awesome, strips the Font Awesome icon rules (and,
+when fontTools is installed, the font glyphs) not used by any template, writes
+every asset under a content-hashed filename into app/static/dist together with
+gzip/brotli variants, and records the filenames in manifest.json. Templates
+fall back to the CDN for any asset missing from the manifest.
+
+Usage:
+	python build_assets.py
+"""
+import glob
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import requests
+from config.config import Config
+
+try:
+	import brotli
+except ImportError:
+	brotli = None
+
+try:
+	from fontTools import subset as font_subset
+except ImportError:
+	font_subset = None
+
+BOOTSTRAP_URL = 'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist'
+FONTAWESOME_URL = 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0'
+
+TEMPLATES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', 'templates')
+
+# Matches a group of icon rules sharing one glyph, e.g. `.fa-house:before,.fa-home:before{content:"\f015"}`
+ICON_RULE = re.compile(r'((?:\.fa-[a-z0-9-]+::?before,?)+)\{content:"([^"]*)"\}')
+ICON_SELECTOR = re.compile(r'\.fa-([a-z0-9-]+)::?before')
+SOURCE_MAP = re.compile(r'/\*# sourceMappingURL=[^*]*\*/\s*$')
+
+# Formats that are already compressed
+SKIP_COMPRESSION = ('.woff2',)
+
+
+def fetch(url):
+	"""Download a file and return its content as bytes"""
+	response = requests.get(url, timeout=30)
+	response.raise_for_status()
+	return response.content
+
+
+def used_icons(templates_path=TEMPLATES_PATH):
+	"""Collect the fa-* class names referenced by the templates"""
+	icons = set()
+	for path in glob.glob(os.path.join(templates_path, '**', '*.html'), recursive=True):
+		with open(path, encoding='utf-8') as f:
+			icons.update(re.findall(r'\bfa-([a-z0-9-]+)', f.read()))
+	return icons
+
+
+def subset_icon_css(css, icons):
+	"""
+	Remove the icon rules for icons that are not used.
+	Args:
+		css (str): Font Awesome stylesheet
+		icons (set): Icon names in use, without the fa- prefix
+	Returns:
+		tuple: The reduced stylesheet and the set of glyph codepoints still referenced
+	"""
+	codepoints = set()
+
+	def keep_used(match):
+		selectors = [
+			selector for selector in ICON_SELECTOR.finditer(match.group(1))
+			if selector.group(1) in icons
+		]
+		if not selectors:
+			return ''
+		content = match.group(2)
+		glyph = content.lstrip('\\')
+		codepoints.add(int(glyph, 16) if re.fullmatch(r'[0-9a-fA-F]+', glyph) else ord(glyph[0]))
+		return ','.join(selector.group(0) for selector in selectors) + '{content:"' + content + '"}'
+
+	return ICON_RULE.sub(keep_used, css), codepoints
+
+
+def subset_font(font, codepoints):
+	"""Reduce a woff2 font to the given codepoints, if fontTools is available"""
+	if font_subset is None or brotli is None:
+		print('fontTools/brotli not installed, keeping the full icon font')
+		return font
+
+	options = font_subset.Options()
+	options.flavor = 'woff2'
+	options.layout_features = ['*']
+	loaded = font_subset.load_font(io.BytesIO(font), options)
+	subsetter = font_subset.Subsetter(options)
+	subsetter.populate(unicodes=codepoints)
+	subsetter.subset(loaded)
+	output = io.BytesIO()
+	font_subset.save_font(loaded, output, options)
+	return output.getvalue()
+
+
+def write_asset(dist_path, name, content):
+	"""
+	Write an asset under its fingerprinted filename, with compressed variants.
+	Args:
+		dist_path (str): Output directory
+		name (str): Logical asset name, e.g. bootstrap.css
+		content (bytes): Asset content
+	Returns:
+		str: The fingerprinted filename
+	"""
+	stem, extension = os.path.splitext(name)
+	digest = hashlib.sha256(content).hexdigest()[:12]
+	filename = f'{stem}.{digest}{extension}'
+	path = os.path.join(dist_path, filename)
+
+	with open(path, 'wb') as f:
+		f.write(content)
+
+	if extension not in SKIP_COMPRESSION:
+		with open(path + '.gz', 'wb') as f:
+			f.write(gzip.compress(content, compresslevel=9))
+		if brotli is not None:
+			with open(path + '.br', 'wb') as f:
+				f.write(brotli.compress(content, quality=11))
+
+	return filename
+
+
+def build_assets(dist_path=Config.ASSET_DIST_PATH, manifest_path=Config.ASSET_MANIFEST_PATH):
+	"""Build the vendored assets and write the manifest"""
+	shutil.rmtree(dist_path, ignore_errors=True)
+	os.makedirs(dist_path)
+	manifest = {}
+
+	for name, url in (
+		('bootstrap.css', f'{BOOTSTRAP_URL}/css/bootstrap.min.css'),
+		('bootstrap.js', f'{BOOTSTRAP_URL}/js/bootstrap.bundle.min.js'),
+	):
+		content = SOURCE_MAP.sub('', fetch(url).decode('utf-8'))
+		manifest[name] = write_asset(dist_path, name, content.encode('utf-8'))
+
+	# Only the solid style is used by the templates
+	css = SOURCE_MAP.sub('', fetch(f'{FONTAWESOME_URL}/css/fontawesome.min.css').decode('utf-8'))
+	css, codepoints = subset_icon_css(css, used_icons())
+	font = subset_font(fetch(f'{FONTAWESOME_URL}/webfonts/fa-solid-900.woff2'), codepoints)
+	font_filename = write_asset(dist_path, 'fa-solid-900.woff2', font)
+	manifest['fa-solid-900.woff2'] = font_filename
+
+	solid = SOURCE_MAP.sub('', fetch(f'{FONTAWESOME_URL}/css/solid.min.css').decode('utf-8'))
+	solid = re.sub(r'src:url\([^;}]*', f'src:url({font_filename}) format("woff2")', solid)
+	manifest['fontawesome.css'] = write_asset(dist_path, 'fontawesome.css', (css + solid).encode('utf-8'))
+
+	with open(manifest_path, 'w') as f:
+		json.dump(manifest, f, indent=2)
+
+	print(f"Built {len(manifest)} assets into {dist_path}")
+
+
+if __name__ == '__main__':
+	build_assets()
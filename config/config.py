@@ -3,14 +3,16 @@ import os
 # Get the absolute path to the instance folder
 basedir = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
 instance_path = os.path.join(basedir, 'instance')
-
-# Create instance directory if it doesn't exist
-os.makedirs(instance_path, exist_ok=True)
+asset_dist_path = os.path.join(basedir, 'app', 'static', 'dist')
 
 class Config:
 	"""Base configuration"""
-	# Generate a random secret key
-	SECRET_KEY = os.urandom(24)
+	# A random secret key is generated by create_app if none is set.
+	# Set SECRET_KEY when running several workers so they all share it.
+	SECRET_KEY = os.getenv('SECRET_KEY')
+	
+	# Instance directory, created by create_app if it doesn't exist
+	INSTANCE_PATH = instance_path
 	
 	# Database configuration
 	DATABASE_PATH = os.path.join(instance_path, 'moviwebapp.db')
@@ -21,6 +23,47 @@ class Config:
 	# OMDb API configuration
 	OMDB_API_KEY = os.getenv('OMDB_API_KEY', 'your_api_key_here')  # Replace with your actual API key
 	OMDB_API_URL = 'http://www.omdbapi.com/'
+	
+	# Title autocomplete configuration
+	TITLE_INDEX_MAX_ENTRIES = 50000  # Upper bound on titles held in memory
+	SUGGEST_MAX_RESULTS = 10
+	SUGGEST_OMDB_MIN_LENGTH = 3  # Shorter queries never fall back to OMDb
+	SUGGEST_OMDB_TIMEOUT = 2.0  # Seconds to wait for OMDb's search
+	SUGGEST_MISS_CACHE_SIZE = 1024  # Queries without OMDb results remembered at once
+	SUGGEST_MISS_CACHE_TTL = 3600  # Seconds before such a query is sent to OMDb again
+	
+	# Static asset configuration (see build_assets.py)
+	ASSET_DIST_PATH = asset_dist_path
+	ASSET_MANIFEST_PATH = os.path.join(asset_dist_path, 'manifest.json')
+	ASSET_MAX_AGE = 31536000  # One year; fingerprinted assets never change
+	
+	# "Similar movies" recommendations (see `flask build-recommendations`)
+	RECOMMENDATIONS_TOP_K = 10  # Similar titles stored per title
+	RECOMMENDATIONS_MIN_COOCCURRENCE = 1  # Users that must have both titles
+	RECOMMENDATIONS_CHUNK_SIZE = 1024  # Titles whose similarities are computed at once
+	
+	# Streaming of large movie listings
+	MOVIES_BATCH_SIZE = 500  # Movies fetched per database round trip
+	STREAM_BUFFER_SIZE = 20  # Template chunks buffered before each write
+	
+	# Compression of dynamic HTML responses
+	COMPRESS_MIN_SIZE = 1024  # Smaller responses are sent uncompressed
+	COMPRESS_LEVEL = 6
+	
+	# Admission control of the expensive routes, shared by all workers on the host
+	LIMITER_DB_PATH = os.path.join(instance_path, 'limiter.db')
+	LIMITER_SLOT_TTL = 60  # Seconds before a slot that was never released expires
+	LIMITER_ROUTES = {
+		'main.add_movie': {'methods': ('POST',), 'concurrency': 8, 'rate': 1.0, 'burst': 10, 'queue_timeout': 2.0, 'retry_after': 2},
+		'main.update_movie': {'methods': ('POST',), 'concurrency': 8, 'rate': 1.0, 'burst': 10, 'queue_timeout': 2.0, 'retry_after': 2},
+		'main.delete_user': {'methods': ('POST',), 'concurrency': 2, 'rate': 0.2, 'burst': 3, 'queue_timeout': 1.0, 'retry_after': 5},
+		# Autocomplete may call OMDb on every debounced keystroke
+		'main.suggest_titles': {'methods': ('GET',), 'concurrency': 16, 'rate': 3.0, 'burst': 15, 'queue_timeout': 0.5, 'retry_after': 1},
+	}
+	
+	# Boot configuration
+	JINJA_BYTECODE_CACHE_DIR = None  # Directory for compiled templates, disabled if None
+	PRELOAD_APP = False  # Set when the app is created before forking workers (gunicorn --preload)
 
 class DevelopmentConfig(Config):
 	"""Development configuration."""
@@ -32,10 +75,15 @@ class TestingConfig(Config):
 	"""Testing configuration."""
 	TESTING = True
 	SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+	LIMITER_DB_PATH = None  # In-memory limiter state private to each app
 
 class ProductionConfig(Config):
 	"""Production configuration."""
 	DEBUG = False
+	SQLALCHEMY_DATABASE_URI = f'sqlite:///{os.path.join(instance_path, "moviwebapp.db")}'
+	SQLALCHEMY_TRACK_MODIFICATIONS = False
+	JINJA_BYTECODE_CACHE_DIR = os.path.join(instance_path, 'jinja_cache')
+	PRELOAD_APP = True
 
 # Configuration dictionary
 config = {
@@ -107,4 +107,474 @@ def test_error_handling(client):
 	# Test 500 error (simulated)
 	response = client.get('/simulate-error')
 	assert response.status_code == 500
-	assert b'Internal Server Error' in response.data 
\ No newline at end of file
+	assert b'Internal Server Error' in response.data 
+
+def test_suggest_titles_from_index(app, client, monkeypatch):
+	from app.services.omdb_service import OMDbService
+	monkeypatch.setattr(OMDbService, 'search_movie', staticmethod(lambda title: None))
+
+	user = User()
+	user.name = 'Test User'
+	db.session.add(user)
+	db.session.commit()
+
+	client.post(f'/users/{user.id}/movies/add', data={
+		'title': 'The Matrix',
+		'director': 'Lana Wachowski',
+		'year': '1999',
+		'rating': '8.7'
+	})
+
+	response = client.get('/api/suggest?q=the ma')
+	assert response.status_code == 200
+	data = response.get_json()
+	assert data['source'] == 'local'
+	assert data['suggestions'] == ['The Matrix']
+
+def test_suggest_titles_falls_back_to_omdb(app, client, monkeypatch):
+	from app.services.omdb_service import OMDbService
+	monkeypatch.setattr(OMDbService, 'search_titles', staticmethod(lambda query: ['Inception']))
+
+	response = client.get('/api/suggest?q=Incep')
+	data = response.get_json()
+	assert data['source'] == 'omdb'
+	assert data['suggestions'] == ['Inception']
+
+	# OMDb results are indexed for subsequent lookups
+	response = client.get('/api/suggest?q=inc')
+	assert response.get_json() == {'query': 'inc', 'source': 'local', 'suggestions': ['Inception']}
+
+def test_suggest_titles_remembers_omdb_misses(app, client, monkeypatch):
+	import requests
+
+	calls = []
+	class NoResults:
+		def raise_for_status(self):
+			pass
+		def json(self):
+			return {'Response': 'False', 'Error': 'Movie not found!'}
+
+	def fake_get(url, params=None, timeout=None):
+		calls.append(timeout)
+		return NoResults()
+	monkeypatch.setattr(requests, 'get', fake_get)
+
+	for _ in range(2):
+		data = client.get('/api/suggest?q=Zzyzx').get_json()
+		assert data['suggestions'] == []
+
+	# OMDb is asked once, with a timeout, and the miss is remembered
+	assert calls == [app.config['SUGGEST_OMDB_TIMEOUT']]
+	assert data['source'] == 'local'
+
+def test_suggest_titles_retries_after_omdb_error(app, client, monkeypatch):
+	import requests
+
+	class Results:
+		def raise_for_status(self):
+			pass
+		def json(self):
+			return {'Response': 'True', 'Search': [{'Title': 'The Godfather'}]}
+
+	def timed_out(url, params=None, timeout=None):
+		raise requests.Timeout('read timed out')
+	monkeypatch.setattr(requests, 'get', timed_out)
+	data = client.get('/api/suggest?q=Godfather').get_json()
+	assert data == {'query': 'Godfather', 'source': 'omdb', 'suggestions': []}
+
+	# The failure is not remembered as a miss once OMDb is back
+	monkeypatch.setattr(requests, 'get', lambda url, params=None, timeout=None: Results())
+	data = client.get('/api/suggest?q=Godfather').get_json()
+	assert data == {'query': 'Godfather', 'source': 'omdb', 'suggestions': ['The Godfather']}
+
+def test_html_response_compression(client):
+	import gzip
+	response = client.get('/add_user', headers={'Accept-Encoding': 'gzip'})
+	assert response.headers['Content-Encoding'] == 'gzip'
+	assert b'Add' in gzip.decompress(response.data)
+
+	# Clients that do not accept gzip get the plain response
+	response = client.get('/add_user')
+	assert 'Content-Encoding' not in response.headers
+
+def test_serve_fingerprinted_asset(app, client, tmp_path):
+	import gzip
+	(tmp_path / 'bootstrap.0123456789ab.css').write_text('body{}')
+	(tmp_path / 'bootstrap.0123456789ab.css.gz').write_bytes(gzip.compress(b'body{}'))
+	app.config['ASSET_DIST_PATH'] = str(tmp_path)
+	app.config['asset_manifest'] = {'bootstrap.css': 'bootstrap.0123456789ab.css'}
+
+	response = client.get('/assets/bootstrap.0123456789ab.css', headers={'Accept-Encoding': 'gzip, br'})
+	assert response.status_code == 200
+	assert response.headers['Content-Encoding'] == 'gzip'
+	assert response.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+	assert response.mimetype == 'text/css'
+	assert gzip.decompress(response.data) == b'body{}'
+	response.close()
+
+	# Files outside the manifest are never served
+	response = client.get('/assets/bootstrap.0123456789ab.css.gz')
+	assert response.status_code == 404
+
+def test_user_movies_streamed(client):
+	user = User()
+	user.name = 'Test User'
+	db.session.add(user)
+	db.session.commit()
+
+	for i in range(3):
+		movie = Movie()
+		movie.title = f'Test Movie {i}'
+		movie.user_id = user.id
+		db.session.add(movie)
+	db.session.commit()
+
+	response = client.get(f'/users/{user.id}/movies', buffered=False)
+	assert response.status_code == 200
+	assert response.is_streamed
+	html = response.get_data(as_text=True)
+	assert all(f'Test Movie {i}' in html for i in range(3))
+	assert 'No Movies Yet' not in html
+
+def test_user_movies_empty(client):
+	user = User()
+	user.name = 'Test User'
+	db.session.add(user)
+	db.session.commit()
+
+	response = client.get(f'/users/{user.id}/movies')
+	html = response.get_data(as_text=True)
+	assert 'No Movies Yet' in html
+	assert 'No movies found for this user' in html
+
+	# The flashed message is consumed by the streamed page
+	response = client.get('/add_user')
+	assert 'No movies found for this user' not in response.get_data(as_text=True)
+
+def test_ensure_schema_runs_once(app):
+	from app.models.models import ensure_schema
+	# create_app already brought the schema up to date
+	assert ensure_schema() is False
+
+def test_build_recommendations(app, client, monkeypatch):
+	from app.services.omdb_service import OMDbService
+	monkeypatch.setattr(OMDbService, 'search_movie', staticmethod(lambda title: None))
+
+	collections = {
+		'Alice': ['The Matrix', 'Inception', 'Alien'],
+		'Bob': ['the matrix', 'Inception'],
+		'Carol': ['Alien', 'Heat']
+	}
+	for name, titles in collections.items():
+		client.post('/add_user', data={'name': name})
+		user = User.query.filter_by(name=name).first()
+		for title in titles:
+			movie = Movie()
+			movie.title = title
+			movie.user_id = user.id
+			db.session.add(movie)
+	db.session.commit()
+
+	result = app.test_cli_runner().invoke(args=['build-recommendations', '--full'])
+	assert result.exit_code == 0, result.output
+
+	data = client.get('/api/similar?title=The%20Matrix').get_json()
+	assert [similar['title'] for similar in data['similar']] == ['Inception', 'Alien']
+	assert data['similar'][0]['score'] == pytest.approx(1.0)
+
+	# Titles the viewed user already has are not recommended
+	bob = User.query.filter_by(name='Bob').first()
+	data = client.get(f'/api/similar?title=The%20Matrix&user_id={bob.id}').get_json()
+	assert [similar['title'] for similar in data['similar']] == ['Alien']
+
+	# Changes made through the app are picked up by incremental builds
+	client.post(f'/users/{bob.id}/movies/add', data={'title': 'Heat', 'year': '1995', 'rating': '8.3'})
+	result = app.test_cli_runner().invoke(args=['build-recommendations'])
+	assert result.exit_code == 0, result.output
+
+	data = client.get('/api/similar?title=Heat').get_json()
+	assert [similar['title'] for similar in data['similar']] == ['Alien', 'Inception', 'The Matrix']
+
+def test_rate_limited_route(app, client):
+	limiter = app.config['limiter']
+	limiter.limits['main.delete_user'] = {'methods': ('POST',), 'concurrency': 2, 'rate': 0.1, 'burst': 1, 'queue_timeout': 0, 'retry_after': 1}
+
+	response = client.post('/users/1/delete')
+	assert response.status_code == 302
+
+	response = client.post('/users/1/delete')
+	assert response.status_code == 429
+	assert response.headers['Retry-After'] == '10'
+
+	# Forms are never limited
+	assert client.get('/users/1/movies/add').status_code == 200
+
+def test_rate_limited_suggestions(app, client):
+	limiter = app.config['limiter']
+	limiter.limits['main.suggest_titles'] = {'methods': ('GET',), 'concurrency': 4, 'rate': 0.5, 'burst': 2, 'queue_timeout': 0, 'retry_after': 1}
+
+	for _ in range(2):
+		assert client.get('/api/suggest?q=ma').status_code == 200
+
+	response = client.get('/api/suggest?q=mat')
+	assert response.status_code == 429
+	assert response.headers['Retry-After'] == '2'
+
+def test_overloaded_route(app, client):
+	limiter = app.config['limiter']
+	limiter.limits['main.delete_user'] = {'methods': ('POST',), 'concurrency': 1, 'rate': 10, 'burst': 10, 'queue_timeout': 0, 'retry_after': 3}
+	slot_id, _, _ = limiter.acquire('main.delete_user', 'other-client')
+
+	response = client.post('/users/1/delete')
+	assert response.status_code == 503
+	assert response.headers['Retry-After'] == '3'
+
+	limiter.release(slot_id)
+	assert client.post('/users/1/delete').status_code == 302
+
+	metrics = client.get('/metrics').get_data(as_text=True)
+	assert 'moviweb_admission_in_flight{route="main.delete_user"} 0' in metrics
+	assert 'moviweb_admission_requests_total{route="main.delete_user",outcome="admitted"} 2' in metrics
+	assert 'moviweb_admission_requests_total{route="main.delete_user",outcome="overloaded"} 1' in metrics
+
+def test_export_columns(app, tmp_path):
+	from datetime import datetime
+	import numpy as np
+
+	user = User()
+	user.name = 'Test User'
+	db.session.add(user)
+	db.session.commit()
+	user_id = user.id
+	for title, created_at in [('Amélie', datetime(2024, 5, 1, 10)), ('Heat', datetime(2024, 5, 2, 9))]:
+		movie = Movie()
+		movie.title = title
+		movie.year = 2001
+		movie.user_id = user_id
+		movie.created_at = created_at
+		db.session.add(movie)
+	db.session.commit()
+
+	runner = app.test_cli_runner()
+	result = runner.invoke(args=['export-columns', str(tmp_path), '--table', 'movies', '--chunk-size', '0'])
+	assert result.exit_code == 2
+	assert not (tmp_path / '_export_state.json').exists()
+
+	result = runner.invoke(args=['export-columns', str(tmp_path), '--table', 'movies', '--chunk-size', '1'])
+	assert result.exit_code == 0, result.output
+	assert 'exported 2 rows into 2 partitions' in result.output
+
+	part = next((tmp_path / 'movies' / 'created=2024-05-01').iterdir())
+	offsets = np.load(part / 'title.offsets.npy')
+	data = np.load(part / 'title.data.npy')
+	assert data[offsets[0]:offsets[1]].tobytes().decode('utf-8') == 'Amélie'
+	assert np.load(part / 'year.npy').tolist() == [2001]
+	assert np.isnan(np.load(part / 'rating.npy')[0])
+	assert np.load(part / 'created_at.npy')[0] == np.datetime64('2024-05-01T10:00')
+	assert (part / 'id.npy').read_bytes()[6:10] == bytes([1, 0, 118, 0])
+
+	# Later runs only export new rows, as a new part of the partition
+	movie = Movie()
+	movie.title = 'Alien'
+	movie.user_id = user_id
+	movie.created_at = datetime(2024, 5, 2, 12)
+	db.session.add(movie)
+	db.session.commit()
+
+	result = runner.invoke(args=['export-columns', str(tmp_path), '--table', 'movies'])
+	assert 'exported 1 rows into 1 partitions' in result.output
+	parts = sorted((tmp_path / 'movies' / 'created=2024-05-02').iterdir())
+	assert [len(np.load(part / 'id.npy')) for part in parts] == [1, 1]
+
+def test_streamed_page_compression(client):
+	import gzip
+	user = User()
+	user.name = 'Test User'
+	db.session.add(user)
+	db.session.commit()
+	movie = Movie()
+	movie.title = 'Test Movie'
+	movie.user_id = user.id
+	db.session.add(movie)
+	db.session.commit()
+
+	response = client.get(f'/users/{user.id}/movies', headers={'Accept-Encoding': 'gzip'})
+	assert response.headers['Content-Encoding'] == 'gzip'
+	html = gzip.decompress(response.data).decode('utf-8')
+	assert 'Test Movie' in html
+	assert html.rstrip().endswith('</html>')
+
+def test_user_movies_error_while_streaming(app, client, monkeypatch):
+	user = User()
+	user.name = 'Test User'
+	db.session.add(user)
+	db.session.commit()
+	movie = Movie()
+	movie.title = 'Test Movie'
+	movie.user_id = user.id
+	db.session.add(movie)
+	db.session.commit()
+
+	def failing_movies(user_id, batch_size):
+		yield Movie.query.get(movie.id)
+		raise RuntimeError('cursor failed')
+	monkeypatch.setattr(app.config['data_manager'], 'iter_user_movies', failing_movies)
+
+	response = client.get(f'/users/{user.id}/movies')
+	assert response.status_code == 200
+	html = response.get_data(as_text=True)
+	assert 'An error occurred while loading the user&#39;s movies.' in html
+	assert html.endswith('</html>')
+
+def test_write_while_user_movies_streams(tmp_path, monkeypatch):
+	import sqlite3
+	from config.config import config, TestingConfig
+
+	database_path = tmp_path / 'movies.db'
+	class FileConfig(TestingConfig):
+		SQLALCHEMY_DATABASE_URI = f'sqlite:///{database_path}'
+		SQLALCHEMY_TRACK_MODIFICATIONS = False
+		MOVIES_BATCH_SIZE = 10
+		STREAM_BUFFER_SIZE = 2
+	monkeypatch.setitem(config, 'file', FileConfig)
+
+	app = create_app('file')
+	with app.app_context():
+		user = User()
+		user.name = 'Test User'
+		db.session.add(user)
+		db.session.commit()
+		user_id = user.id
+		for i in range(100):
+			movie = Movie()
+			movie.title = f'Test Movie {i}'
+			movie.user_id = user_id
+			db.session.add(movie)
+		db.session.commit()
+		db.session.remove()
+
+	response = app.test_client().get(f'/users/{user_id}/movies', buffered=False)
+	chunks = iter(response.response)
+	html = ''
+	while 'Test Movie 15' not in html:
+		html += next(chunks).decode('utf-8')
+	assert 'Test Movie 99' not in html
+
+	# Other connections can write while the page is still streaming
+	writer = sqlite3.connect(database_path, timeout=0)
+	writer.execute("INSERT INTO movies (title, user_id) VALUES ('Other Movie', ?)", (user_id,))
+	writer.commit()
+	writer.close()
+
+	html += b''.join(chunks).decode('utf-8')
+	response.close()
+	assert all(f'Test Movie {i}' in html for i in range(100))
+
+def test_incremental_recommendations_after_delete(app, client):
+	user_ids = {}
+	for name, titles in {'a': ['A', 'B'], 'b': ['C']}.items():
+		user = User()
+		user.name = name
+		db.session.add(user)
+		db.session.commit()
+		user_ids[name] = user.id
+		for title in titles:
+			movie = Movie()
+			movie.title = title
+			movie.user_id = user.id
+			db.session.add(movie)
+	db.session.commit()
+	movie_id = Movie.query.filter_by(title='A').first().id
+
+	runner = app.test_cli_runner()
+	assert runner.invoke(args=['build-recommendations', '--full']).exit_code == 0
+	data_manager = app.config['data_manager']
+	assert [similar.similar_title for similar in data_manager.get_similar_movies('B')] == ['A']
+
+	client.get(f"/users/{user_ids['a']}/movies/{movie_id}/delete")
+	assert runner.invoke(args=['build-recommendations']).exit_code == 0
+	assert data_manager.get_similar_movies('B') == []
+	assert data_manager.get_similar_movies('A') == []
+
+def test_export_columns_retry_after_failure(app, tmp_path, monkeypatch):
+	from datetime import datetime
+	import numpy as np
+	from app.services import columnar_export
+
+	user = User()
+	user.name = 'Test User'
+	db.session.add(user)
+	db.session.commit()
+	user_id = user.id
+
+	def add_movies(count, day):
+		for i in range(count):
+			movie = Movie()
+			movie.title = f'Movie {day}-{i}'
+			movie.user_id = user_id
+			movie.created_at = datetime(2024, 5, day, i)
+			db.session.add(movie)
+		db.session.commit()
+
+	def exported_ids():
+		return sorted(
+			id_ for path in (tmp_path / 'movies').glob('created=*/part-*/id.npy')
+			for id_ in np.load(path).tolist()
+		)
+
+	add_movies(3, 1)
+	add_movies(3, 2)
+
+	# Fail after the first partition has been written
+	append = columnar_export.PartWriter.append
+	def failing_append(self, rows):
+		if rows[0][0] > 3:
+			raise RuntimeError('export interrupted')
+		append(self, rows)
+	monkeypatch.setattr(columnar_export.PartWriter, 'append', failing_append)
+
+	runner = app.test_cli_runner()
+	result = runner.invoke(args=['export-columns', str(tmp_path), '--table', 'movies'])
+	assert result.exit_code != 0
+	assert exported_ids() == []
+
+	monkeypatch.setattr(columnar_export.PartWriter, 'append', append)
+	add_movies(2, 3)
+	result = runner.invoke(args=['export-columns', str(tmp_path), '--table', 'movies'])
+	assert result.exit_code == 0, result.output
+	assert exported_ids() == [movie.id for movie in Movie.query.order_by(Movie.id)]
+	assert not list(tmp_path.glob('_tmp-*'))
+
+def test_subset_icon_css():
+	from build_assets import subset_icon_css
+	css = (
+		'.fa{display:inline-block}'
+		'.fa-0:before{content:"\\30"}'
+		'.fa-house:before,.fa-home:before{content:"\\f015"}'
+		'.fa-film:before{content:"\\f008"}'
+		'.fa-trash::before{content:"\\f1f8"}'
+	)
+
+	subset, codepoints = subset_icon_css(css, {'0', 'home', 'trash'})
+	assert subset == (
+		'.fa{display:inline-block}'
+		'.fa-0:before{content:"\\30"}'
+		'.fa-home:before{content:"\\f015"}'
+		'.fa-trash::before{content:"\\f1f8"}'
+	)
+	assert codepoints == {0x30, 0xf015, 0xf1f8}
+
+def test_write_asset(tmp_path):
+	import gzip
+	import hashlib
+	from build_assets import write_asset
+	content = b'body{margin:0}'
+
+	filename = write_asset(str(tmp_path), 'bootstrap.css', content)
+	assert filename == f'bootstrap.{hashlib.sha256(content).hexdigest()[:12]}.css'
+	assert (tmp_path / filename).read_bytes() == content
+	assert gzip.decompress((tmp_path / f'{filename}.gz').read_bytes()) == content
+
+	# Fonts are already compressed
+	filename = write_asset(str(tmp_path), 'fa-solid-900.woff2', b'wOF2')
+	assert not (tmp_path / f'{filename}.gz').exists()
@@ -0,0 +1,11 @@
+"""WSGI entry point for production servers.
+
+Run with gunicorn's --preload so the app (schema check, title index and
+template compilation) is initialized once before the workers are forked:
+
+	SECRET_KEY=... gunicorn --preload -w 4 wsgi:app
+"""
+import os
+from app import create_app
+
+app = create_app(os.getenv('FLASK_CONFIG', 'production'))